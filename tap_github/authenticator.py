@@ -163,7 +163,7 @@ class GitHubTokenAuthenticator(APIAuthenticatorBase):
         filtered_tokens = []
         for token in list(set(available_tokens)):
             try:
-                response = requests.get(
+                response = self.requests_session.get(
                     url="https://api.github.com/rate_limit",
                     headers={
                         "Authorization": f"token {token}",
@@ -198,6 +198,9 @@ class GitHubTokenAuthenticator(APIAuthenticatorBase):
         self.logger: logging.Logger = stream.logger
         self.tap_name: str = stream.tap_name
         self._config: Dict[str, Any] = dict(stream.config)
+        # Reuse the stream's session (shared by the whole tap) so that token
+        # checks do not each open a new connection to the API.
+        self.requests_session: requests.Session = stream.requests_session
         self.tokens_map = self.prepare_tokens()
         self.active_token: Optional[TokenRateLimit] = (
             choice(list(self.tokens_map.values())) if len(self.tokens_map) else None
@@ -223,6 +226,10 @@ class GitHubTokenAuthenticator(APIAuthenticatorBase):
         # If no token or only one token is available, return early.
         if len(self.tokens_map) <= 1 or self.active_token is None:
             return
+        # Other resources such as "search" have their own, much smaller, limits
+        # which must not be mistaken for the core limit tracked here.
+        if response_headers.get("X-RateLimit-Resource", "core") != "core":
+            return
 
         self.active_token.update_rate_limit(response_headers)
 
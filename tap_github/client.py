@@ -3,8 +3,9 @@
 import collections
 import inspect
 import re
+import time
 from types import FrameType
-from typing import Any, Dict, Iterable, List, Optional, cast
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, cast
 from urllib.parse import parse_qs, urlparse
 
 import requests
@@ -16,6 +17,15 @@ from singer_sdk.streams import GraphQLStream, RESTStream
 
 from tap_github.authenticator import GitHubTokenAuthenticator
 
+try:
+    # Optional, much faster JSON decoder. The standard library is used otherwise.
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore
+
+if TYPE_CHECKING:
+    from tap_github.tap import TapGitHub
+
 
 class GitHubRestStream(RESTStream):
     """GitHub Rest stream class."""
@@ -33,6 +43,12 @@ class GitHubRestStream(RESTStream):
 
     _authenticator: Optional[GitHubTokenAuthenticator] = None
 
+    # The decoded body of the last response and a copy of its last row,
+    # see `response_json` and `get_last_row`.
+    _last_response: Optional[requests.Response] = None
+    _last_response_json: Any = None
+    _last_row: Optional[dict] = None
+
     @property
     def authenticator(self) -> GitHubTokenAuthenticator:
         if self._authenticator is None:
@@ -43,6 +59,11 @@ class GitHubRestStream(RESTStream):
     def url_base(self) -> str:
         return self.config.get("api_url_base", self.DEFAULT_API_BASE_URL)
 
+    @property
+    def requests_session(self) -> requests.Session:
+        """Use the tap-level session so that connections are reused across streams."""
+        return cast("TapGitHub", self._tap).requests_session
+
     primary_keys = ["id"]
     replication_key: Optional[str] = None
     tolerated_http_errors: List[int] = []
@@ -54,6 +75,96 @@ class GitHubRestStream(RESTStream):
         headers["User-Agent"] = cast(str, self.config.get("user_agent", "tap-github"))
         return headers
 
+    def prepare_request(
+        self, context: Optional[dict], next_page_token: Optional[Any]
+    ) -> requests.PreparedRequest:
+        """Prepare a request, making it conditional if its ETag is cached.
+
+        GitHub answers `304 Not Modified` to a request whose `If-None-Match`
+        header matches the current ETag, and such responses do not count
+        against the rate limit. The cached body is then substituted in.
+        """
+        prepared_request = super().prepare_request(context, next_page_token)
+        etag_cache = cast("TapGitHub", self._tap).etag_cache
+        if etag_cache is None or prepared_request.method != "GET":
+            return prepared_request
+        # Requests filtered with "since" change from one run to the next and
+        # would never be answered from the cache, don't store them.
+        if "since" in parse_qs(str(urlparse(prepared_request.url).query)):
+            return prepared_request
+
+        cached = etag_cache.get(self._etag_cache_key(prepared_request))
+        if cached is not None:
+            prepared_request.headers["If-None-Match"] = cached["etag"]
+        prepared_request.register_hook("response", self._etag_response_hook)
+        return prepared_request
+
+    @staticmethod
+    def _etag_cache_key(request: requests.PreparedRequest) -> str:
+        # The same url can be requested with several media types, e.g. readme.
+        return f'{request.headers.get("Accept")} {request.url}'
+
+    def _etag_response_hook(
+        self, response: requests.Response, *args: Any, **kwargs: Any
+    ) -> requests.Response:
+        """Store fresh responses in the ETag cache, restore cached ones on 304."""
+        etag_cache = cast("TapGitHub", self._tap).etag_cache
+        if etag_cache is None:
+            return response
+
+        key = self._etag_cache_key(response.request)
+        if response.status_code == 304 and key in etag_cache:
+            cached = etag_cache[key]
+            # Read the (empty) 304 body first, so that the connection is
+            # released to the pool and kept alive for the next request.
+            response.content
+            response.status_code = 200
+            response._content = cached["content"]
+            if cached["link"] and "Link" not in response.headers:
+                response.headers["Link"] = cached["link"]
+            # Entries which are not used for a while are evicted, see
+            # `TapGitHub.etag_cache`.
+            etag_cache[key] = {**cached, "last_used": time.time()}
+        elif response.status_code == 200 and "ETag" in response.headers:
+            etag_cache[key] = {
+                "etag": response.headers["ETag"],
+                "content": response.content,
+                "link": response.headers.get("Link"),
+                "last_used": time.time(),
+            }
+        return response
+
+    def response_json(self, response: requests.Response) -> Any:
+        """Return the decoded JSON body of a response.
+
+        The result is memoized for the last response seen, so that streams
+        which need the body outside of `parse_response` do not decode the same
+        payload twice. The rows it contains are the ones handed out to
+        `post_process`, which modifies them in place: pagination logic must use
+        `get_last_row` rather than read them back from here.
+        """
+        if response is not self._last_response:
+            self._last_response_json = (
+                orjson.loads(response.content) if orjson else response.json()
+            )
+            self._last_response = response
+            last_row = self._extract_last_row(self._last_response_json)
+            self._last_row = dict(last_row) if last_row is not None else None
+        return self._last_response_json
+
+    def _extract_last_row(self, resp_json: Any) -> Optional[dict]:
+        """Return the last row of a decoded page, or None if there is none."""
+        if isinstance(resp_json, list):
+            results = resp_json
+        else:
+            results = resp_json.get("items") or []
+        return results[-1] if results and isinstance(results[-1], dict) else None
+
+    def get_last_row(self, response: requests.Response) -> Optional[dict]:
+        """Return a copy of the last row of a page, taken before post-processing."""
+        self.response_json(response)
+        return self._last_row
+
     def get_next_page_token(
         self, response: requests.Response, previous_token: Optional[Any]
     ) -> Optional[Any]:
@@ -71,14 +182,10 @@ class GitHubRestStream(RESTStream):
         if "next" not in response.links.keys():
             return None
 
-        resp_json = response.json()
-        if isinstance(resp_json, list):
-            results = resp_json
-        else:
-            results = resp_json.get("items")
+        last_row = self.get_last_row(response)
 
         # Exit early if the response has no items. ? Maybe duplicative the "next" link check.
-        if not results:
+        if last_row is None:
             return None
 
         # Unfortunately endpoints such as /starred, /stargazers, /events and /pulls do not support
@@ -105,7 +212,7 @@ class GitHubRestStream(RESTStream):
             self.replication_key != "commit_timestamp"
             and since
             and direction == "desc"
-            and (parse(results[-1][self.replication_key]) < parse(since))
+            and (parse(last_row[self.replication_key]) < parse(since))
         ):
             return None
 
@@ -147,9 +254,13 @@ class GitHubRestStream(RESTStream):
                 f"The replication key '{self.replication_key}' is not fully supported by this client yet."
             )
 
+        # Endpoints supporting "since" (e.g. /issues, /issues/comments) filter out
+        # older records server-side. Those which do not (see
+        # `missing_since_parameter`) ignore it, but it is still read back from
+        # the request in `get_next_page_token` to stop paginating early.
         since = self.get_starting_timestamp(context)
         if self.replication_key and since:
-            params["since"] = since
+            params["since"] = since.isoformat()
         return params
 
     def validate_response(self, response: requests.Response) -> None:
@@ -223,7 +334,7 @@ class GitHubRestStream(RESTStream):
         # Update token rate limit info and loop through tokens if needed.
         self.authenticator.update_rate_limit(response.headers)
 
-        resp_json = response.json()
+        resp_json = self.response_json(response)
 
         if isinstance(resp_json, list):
             results = resp_json
@@ -235,7 +346,11 @@ class GitHubRestStream(RESTStream):
         yield from results
 
     def post_process(self, row: dict, context: Optional[Dict[str, str]] = None) -> dict:
-        """Add `repo_id` by default to all streams."""
+        """Add `repo_id` by default to all streams.
+
+        Rows may be modified in place: they are not read again once yielded, the
+        pagination logic works from a copy (see `get_last_row`).
+        """
         if context is not None and "repo_id" in context:
             row["repo_id"] = context["repo_id"]
         return row
@@ -281,7 +396,7 @@ class GitHubGraphqlStream(GraphQLStream, GitHubRestStream):
         .. _requests.Response:
             https://docs.python-requests.org/en/latest/api/#requests.Response
         """
-        resp_json = response.json()
+        resp_json = self.response_json(response)
         yield from extract_jsonpath(self.query_jsonpath, input=resp_json)
 
     def get_next_page_token(
@@ -298,7 +413,7 @@ class GitHubGraphqlStream(GraphQLStream, GitHubRestStream):
         Warning - we recommend to avoid using deep (nested) pagination.
         """
 
-        resp_json = response.json()
+        resp_json = self.response_json(response)
 
         # Find if results contains "hasNextPage_X" flags and if any are True.
         # If so, set nextPageCursor_X to endCursor_X for X max.
@@ -344,7 +459,10 @@ class GitHubGraphqlStream(GraphQLStream, GitHubRestStream):
         self, context: Optional[Dict], next_page_token: Optional[Any]
     ) -> Dict[str, Any]:
         """Return a dictionary of values to be used in URL parameterization."""
-        params = context or dict()
+        params = dict(context or {})
+        # `pushed_at` is only used by REST child streams to skip idle repos,
+        # it is not a variable of any of our GraphQL queries.
+        params.pop("pushed_at", None)
         params["per_page"] = self.MAX_PER_PAGE
         if next_page_token:
             params.update(next_page_token)
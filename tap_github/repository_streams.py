@@ -1,6 +1,8 @@
 """Repository Stream types classes for tap-github."""
 
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple, cast
 from urllib.parse import parse_qs, urlparse
 
 import requests
@@ -18,26 +20,87 @@ from tap_github.schema_objects import (
 from tap_github.scraping import scrape_dependents
 
 
+class _RepositoryIdsStream(GitHubGraphqlStream):
+    """Temp handmade stream to reuse all the graphql setup of the tap.
+
+    Used by `RepositoryStream.get_repo_ids`. It is defined once at import time
+    rather than on every call.
+    """
+
+    name = "tempStream"
+    schema = th.PropertiesList(
+        th.Property("id", th.StringType),
+        th.Property("databaseId", th.IntegerType),
+    ).to_dict()
+
+    # Keep each query small enough to stay well within GitHub's
+    # GraphQL resource limits and request timeouts.
+    MAX_REPOS_PER_QUERY = 100
+
+    def __init__(self, tap, repo_list) -> None:
+        super().__init__(tap)
+        self.repo_list = repo_list
+        # index in `repo_list` of the first repo of the current batch
+        self.offset = 0
+
+    @property
+    def query(self) -> str:
+        chunks = list()
+        batch = self.repo_list[self.offset : self.offset + self.MAX_REPOS_PER_QUERY]
+        # aliases use the index in the full list so that a missing
+        # repo can be traced back to its config entry.
+        for i, repo in enumerate(batch, start=self.offset):
+            chunks.append(
+                f'repo{i}: repository(name: "{repo[1]}", owner: "{repo[0]}") '
+                "{ nameWithOwner databaseId }"
+            )
+        return "query {" + " ".join(chunks) + " }"
+
+
 class RepositoryStream(GitHubRestStream):
     """Defines 'Repository' stream."""
 
-    # Search API max: 1,000 total.
+    # Search API max: 1,000 total. The GraphQL `search` connection has the same
+    # cap, so larger searches are split by `get_search_segments` instead.
     MAX_RESULTS_LIMIT = 1000
+    # No repository on GitHub was created before this date. Used as the lower
+    # bound when splitting large searches by creation date.
+    SEARCH_MIN_CREATED_DATE = date(2007, 10, 1)
 
     name = "repositories"
     # updated_at will be updated any time the repository object is updated,
     # e.g. when the description or the primary language of the repository is updated.
     replication_key = "updated_at"
 
+    state_partitioning_keys: Optional[List[str]] = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # The mode cannot change during a run, and the properties below are read
+        # on every request, so only look it up once.
+        self._search_mode = "searches" in self.config
+        self._has_repositories = "repositories" in self.config
+        if self._search_mode:
+            # Large searches are split in `search_segment`s which change from one
+            # run to the next: keep them out of the state to avoid piling up
+            # bookmarks. The segments of a search share its bookmark.
+            self.state_partitioning_keys = ["search_name", "search_query"]
+
     def get_url_params(
         self, context: Optional[Dict], next_page_token: Optional[Any]
     ) -> Dict[str, Any]:
         """Return a dictionary of values to be used in URL parameterization."""
         assert context is not None, f"Context cannot be empty for '{self.name}' stream."
+        if not self._search_mode and self._has_repositories:
+            # `/repos/{org}/{repo}` returns a single object: there is nothing
+            # to paginate, sort or filter with `since`.
+            return {}
         params = super().get_url_params(context, next_page_token)
         if "search_query" in context:
             # we're in search mode
             params["q"] = context["search_query"]
+            if "search_segment" in context:
+                params["q"] += f' {context["search_segment"]}'
 
         return params
 
@@ -45,22 +108,15 @@ class RepositoryStream(GitHubRestStream):
     def path(self) -> str:  # type: ignore
         """Return the API endpoint path. Path options are mutually exclusive."""
 
-        if "searches" in self.config:
+        if self._search_mode:
             return "/search/repositories"
-        if "repositories" in self.config:
+        if self._has_repositories:
             # the `repo` and `org` args will be parsed from the partition's `context`
             return "/repos/{org}/{repo}"
         if "organizations" in self.config:
             return "/orgs/{org}/repos"
 
-    @property
-    def records_jsonpath(self) -> str:  # type: ignore
-        if "searches" in self.config:
-            return "$.items[*]"
-        else:
-            return "$[*]"
-
-    def get_repo_ids(self, repo_list: List[Tuple[str]]) -> List[Dict[str, str]]:
+    def get_repo_ids(self, repo_list: List[Tuple[str, str]]) -> List[Dict[str, str]]:
         """Enrich the list of repos with their numeric ID from github.
 
         This helps maintain a stable id for context and bookmarks.
@@ -68,38 +124,18 @@ class RepositoryStream(GitHubRestStream):
         It also removes non-existant repos and corrects casing to ensure
         data is correct downstream.
         """
-        # use a temp handmade stream to reuse all the graphql setup of the tap
-        class TempStream(GitHubGraphqlStream):
-            name = "tempStream"
-            schema = th.PropertiesList(
-                th.Property("id", th.StringType),
-                th.Property("databaseId", th.IntegerType),
-            ).to_dict()
-
-            def __init__(self, tap, repo_list) -> None:
-                super().__init__(tap)
-                self.repo_list = repo_list
-
-            @property
-            def query(self) -> str:
-                chunks = list()
-                # there is probably some limit to how many items can be requested
-                # in a single query, but it's well above 1k.
-                for i, repo in enumerate(self.repo_list):
-                    chunks.append(
-                        f'repo{i}: repository(name: "{repo[1]}", owner: "{repo[0]}") '
-                        "{ nameWithOwner databaseId }"
-                    )
-                return "query {" + " ".join(chunks) + " }"
-
         repos_with_ids: list = list()
-        temp_stream = TempStream(self._tap, list(repo_list))
+        temp_stream = _RepositoryIdsStream(self._tap, list(repo_list))
         # replace manually provided org/repo values by the ones obtained
         # from github api. This guarantees that case is correct in the output data.
         # See https://github.com/MeltanoLabs/tap-github/issues/110
         # Also remove repos which do not exist to avoid crashing further down
         # the line.
-        for record in temp_stream.request_records({}):
+        records: List[dict] = list()
+        for offset in range(0, len(repo_list), temp_stream.MAX_REPOS_PER_QUERY):
+            temp_stream.offset = offset
+            records.extend(temp_stream.request_records({}))
+        for record in records:
             for item in record.keys():
                 try:
                     org, repo = record[item]["nameWithOwner"].split("/")
@@ -120,21 +156,132 @@ class RepositoryStream(GitHubRestStream):
         self.logger.info(f"Running the tap on {len(repos_with_ids)} repositories")
         return repos_with_ids
 
+    def get_search_count(self, query: str) -> int:
+        """Return the number of repositories matching a search query.
+
+        Only a single result is requested, as we just need `total_count`.
+        """
+        prepared_request = self.requests_session.prepare_request(
+            requests.Request(
+                method="GET",
+                url=f"{self.url_base}/search/repositories",
+                params={"q": query, "per_page": 1},
+                headers={
+                    **self.http_headers,
+                    **(self.authenticator.auth_headers or {}),
+                },
+            )
+        )
+        decorated_request = self.request_decorator(self._request)
+        response = decorated_request(prepared_request, None)
+        self.wait_for_search_rate_limit(response.headers)
+        return int(self.response_json(response)["total_count"])
+
+    def wait_for_search_rate_limit(self, response_headers: Any) -> None:
+        """Sleep until the search rate limit resets if it has been used up.
+
+        The search API has its own, much smaller, rate limit (30 requests per
+        minute) which is not tracked by the authenticator. Splitting a large
+        search and paginating through it can easily use it up, in which case
+        the next request would be rejected.
+        """
+        remaining = response_headers.get("X-RateLimit-Remaining")
+        reset = response_headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None or int(remaining) > 0:
+            return
+        wait = int(reset) - time.time() + 1
+        if wait > 0:
+            self.logger.info(
+                f"Search API rate limit reached, waiting {int(wait)}s for it to reset."
+            )
+            time.sleep(wait)
+
+    def parse_response(self, response: requests.Response) -> Iterable[dict]:
+        """Parse the response and return an iterator of result rows."""
+        if self._search_mode:
+            self.wait_for_search_rate_limit(response.headers)
+        yield from super().parse_response(response)
+
+    def get_search_segments(self, query: str) -> List[str]:
+        """Split a search query into `created:` segments of less than 1,000 results.
+
+        The search API will not paginate past its 1,000th result, so queries
+        matching more repositories than that are segmented by `created:` date
+        ranges. Ranges are halved until each of them fits under the limit, and
+        the last one is left open-ended so that it includes repositories
+        created after the split.
+
+        Returns an empty list if the query does not need to be split, which is
+        always the case for queries already filtering on `created:`.
+        """
+        limit = cast(int, self.MAX_RESULTS_LIMIT)
+        if "created:" in query or self.get_search_count(query) <= limit:
+            return []
+        # `created:` qualifiers are evaluated in UTC.
+        today = datetime.now(timezone.utc).date()
+
+        def split_range(start: date, end: date) -> List[str]:
+            if end >= today:
+                segment = f"created:>={start.isoformat()}"
+            else:
+                segment = f"created:{start.isoformat()}..{end.isoformat()}"
+            count = self.get_search_count(f"{query} {segment}")
+            if count == 0:
+                return []
+            if count <= limit or start == end:
+                if count > limit:
+                    self.logger.warning(
+                        f"Search '{query} {segment}' matches {count} repositories, "
+                        f"only the first {limit} will be synced."
+                    )
+                return [segment]
+            middle = start + (end - start) // 2
+            return split_range(start, middle) + split_range(
+                middle + timedelta(days=1), end
+            )
+
+        segments = split_range(self.SEARCH_MIN_CREATED_DATE, today)
+        self.logger.info(
+            f"Search '{query}' was split into {len(segments)} segments "
+            "to stay under the search API results limit."
+        )
+        return segments
+
+    _partitions: Optional[List[Dict[str, str]]] = None
+
     @property
     def partitions(self) -> Optional[List[Dict[str, str]]]:
         """Return a list of partitions.
 
         This is called before syncing records, we use it to fetch some additional
-        context
+        context. As this requires API calls and the property is read several
+        times during a sync, the result is computed only once.
         """
-        if "searches" in self.config:
-            return [
-                {"search_name": s["name"], "search_query": s["query"]}
-                for s in self.config["searches"]
+        if self._partitions is None:
+            self._partitions = self._get_partitions()
+        return self._partitions
+
+    def _get_partitions(self) -> Optional[List[Dict[str, str]]]:
+        if self._search_mode:
+            partitions = []
+            for search in self.config["searches"]:
+                partition = {
+                    "search_name": search["name"],
+                    "search_query": search["query"],
+                }
+                segments = self.get_search_segments(search["query"])
+                if not segments:
+                    partitions.append(partition)
+                partitions += [
+                    {**partition, "search_segment": segment} for segment in segments
+                ]
+            return partitions
+        if self._has_repositories:
+            split_repo_names = [
+                (org, repo)
+                for org, repo in (s.split("/", 1) for s in self.config["repositories"])
             ]
-        if "repositories" in self.config:
-            split_repo_names = map(lambda s: s.split("/"), self.config["repositories"])
-            return self.get_repo_ids(list(split_repo_names))
+            return self.get_repo_ids(split_repo_names)
         if "organizations" in self.config:
             return [{"org": org} for org in self.config["organizations"]]
         return None
@@ -150,6 +297,9 @@ class RepositoryStream(GitHubRestStream):
             "org": record["owner"]["login"],
             "repo": record["name"],
             "repo_id": record["id"],
+            # Used by child streams to skip repos without any recent push.
+            # Not set on mock records built when skipping parent streams.
+            "pushed_at": record.get("pushed_at"),
         }
 
     def get_records(self, context: Optional[Dict]) -> Iterable[Dict[str, Any]]:
@@ -443,11 +593,11 @@ class EventsStream(GitHubRestStream):
         # do a 'dumb' tap that just keeps the same schemas as GitHub without renaming these
         # objects to "target_". They are worth keeping, however, as they can be different from
         # the parent stream, e.g. for fork/parent PR events.
+        # Renaming in place is the cheapest option: rebuilding the row under new
+        # keys would copy every field of every event.
         row["target_repo"] = row.pop("repo", None)
         row["target_org"] = row.pop("org", None)
-        if context is not None:
-            row["repo_id"] = context["repo_id"]
-        return row
+        return super().post_process(row, context)
 
     schema = th.PropertiesList(
         th.Property("id", th.StringType),
@@ -683,7 +833,7 @@ class LanguagesStream(GitHubRestStream):
         if response.status_code in self.tolerated_http_errors:
             return []
 
-        languages_json = response.json()
+        languages_json = self.response_json(response)
         for key, value in languages_json.items():
             yield {"language_name": key, "bytes": value}
 
@@ -894,7 +1044,7 @@ class IssueCommentsStream(GitHubRestStream):
         return super().get_records(context)
 
     def post_process(self, row: dict, context: Optional[Dict] = None) -> dict:
-        row["issue_number"] = int(row["issue_url"].split("/")[-1])
+        row["issue_number"] = int(row["issue_url"].rpartition("/")[2])
         if context is not None:
             row["repo_id"] = context["repo_id"]
         if row["body"] is not None:
@@ -954,8 +1104,11 @@ class IssueEventsStream(GitHubRestStream):
         return super().get_records(context)
 
     def post_process(self, row: dict, context: Optional[Dict] = None) -> dict:
-        row["issue_number"] = int(row["issue"].pop("number"))
-        row["issue_url"] = row["issue"].pop("url")
+        # Only the number and url of the issue are kept, drop the rest of the
+        # (large) nested issue object right away.
+        issue = row.pop("issue")
+        row["issue_number"] = int(issue["number"])
+        row["issue_url"] = issue["url"]
         if context is not None:
             row["repo_id"] = context["repo_id"]
         return row
@@ -990,6 +1143,23 @@ class CommitsStream(GitHubRestStream):
     state_partitioning_keys = ["repo", "org"]
     ignore_parent_replication_key = True
 
+    def get_records(self, context: Optional[Dict] = None) -> Iterable[Dict[str, Any]]:
+        """Return a generator of row-type dictionary objects.
+
+        Each row emitted should be a dictionary of property names to their values.
+        """
+        since = self.get_starting_timestamp(context)
+        if (
+            context
+            and context.get("pushed_at")
+            and since
+            and parse(context["pushed_at"]) <= since
+        ):
+            self.logger.debug(f"No push since last sync. Skipping '{self.name}' sync.")
+            return []
+
+        return super().get_records(context)
+
     def post_process(self, row: dict, context: Optional[Dict] = None) -> dict:
         """
         Add a timestamp top-level field to be used as state replication key.
@@ -1577,12 +1747,16 @@ class StargazersGraphqlStream(GitHubGraphqlStream):
         # If since parameter is present, try to exit early by looking at the last "starred_at".
         # Noting that we are traversing in DESCENDING order by STARRED_AT.
         if since:
-            results = extract_jsonpath(self.query_jsonpath, input=response.json())
-            *_, last = results
-            if parse(last["starred_at"]) < parse(since):
+            last = self.get_last_row(response)
+            if last is not None and parse(last["starred_at"]) < parse(since):
                 return None
         return super().get_next_page_token(response, previous_token)
 
+    def _extract_last_row(self, resp_json: Any) -> Optional[dict]:
+        """Return the last stargazer of a decoded page, or None if there is none."""
+        results = list(extract_jsonpath(self.query_jsonpath, input=resp_json))
+        return results[-1] if results else None
+
     @property
     def query(self) -> str:
         """Return dynamic GraphQL query."""
@@ -1825,7 +1999,9 @@ class WorkflowsStream(GitHubRestStream):
 
     def parse_response(self, response: requests.Response) -> Iterable[dict]:
         """Parse the response and return an iterator of result rows."""
-        yield from extract_jsonpath(self.records_jsonpath, input=response.json())
+        yield from extract_jsonpath(
+            self.records_jsonpath, input=self.response_json(response)
+        )
 
 
 class WorkflowRunsStream(GitHubRestStream):
@@ -1880,7 +2056,9 @@ class WorkflowRunsStream(GitHubRestStream):
 
     def parse_response(self, response: requests.Response) -> Iterable[dict]:
         """Parse the response and return an iterator of result rows."""
-        yield from extract_jsonpath(self.records_jsonpath, input=response.json())
+        yield from extract_jsonpath(
+            self.records_jsonpath, input=self.response_json(response)
+        )
 
     def get_child_context(self, record: dict, context: Optional[dict]) -> dict:
         """Return a child context object from the record and optional provided context.
@@ -1954,7 +2132,9 @@ class WorkflowRunJobsStream(GitHubRestStream):
 
     def parse_response(self, response: requests.Response) -> Iterable[dict]:
         """Parse the response and return an iterator of result rows."""
-        yield from extract_jsonpath(self.records_jsonpath, input=response.json())
+        yield from extract_jsonpath(
+            self.records_jsonpath, input=self.response_json(response)
+        )
 
     def get_url_params(
         self, context: Optional[dict], next_page_token: Optional[Any]
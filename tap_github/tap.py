@@ -1,21 +1,107 @@
 """GitHub tap class."""
 
+import atexit
 import logging
 import os
-from typing import List
+import shelve
+import time
+from typing import IO, List, Optional, cast
 
+import requests
 from singer_sdk import Stream, Tap
 from singer_sdk import typing as th  # JSON schema typing helpers
 from singer_sdk.helpers._classproperty import classproperty
 
 from tap_github.streams import Streams
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore
+
 
 class TapGitHub(Tap):
     """GitHub tap class."""
 
     name = "tap-github"
 
+    _requests_session: Optional[requests.Session] = None
+
+    @property
+    def requests_session(self) -> requests.Session:
+        """Get the HTTP session shared by all the streams of the tap.
+
+        Reusing a single session keeps connections to the GitHub API alive
+        across streams and partitions, instead of paying a new TCP and TLS
+        handshake for every stream instance.
+
+        Returns:
+            The tap's `requests.Session`.
+        """
+        if self._requests_session is None:
+            self._requests_session = requests.Session()
+        return self._requests_session
+
+    # Cached responses which were not requested for this long are evicted.
+    ETAG_CACHE_MAX_AGE = 30 * 24 * 60 * 60  # 30 days, in seconds
+
+    _etag_cache: Optional["shelve.Shelf[dict]"] = None
+    _etag_cache_disabled = False
+    _etag_cache_lock: Optional[IO] = None
+
+    def _lock_etag_cache(self) -> bool:
+        """Take an exclusive lock on the ETag cache for this process.
+
+        `shelve` does not support concurrent writers, so when another process
+        already uses the same `etag_cache_path`, the sync goes on without the
+        cache rather than risking to corrupt it.
+
+        Returns:
+            True if the lock was acquired (or locking is not available).
+        """
+        if fcntl is None:
+            return True
+        lock_file = open(f'{self.config["etag_cache_path"]}.lock', "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            self._etag_cache_disabled = True
+            self.logger.warning(
+                f'ETag cache {self.config["etag_cache_path"]} is in use by '
+                "another process, syncing without it. Give each process its "
+                "own `etag_cache_path`."
+            )
+            return False
+        # Keep the file open, the lock is released when the process exits.
+        self._etag_cache_lock = lock_file
+        return True
+
+    @property
+    def etag_cache(self) -> Optional["shelve.Shelf[dict]"]:
+        """Get the on-disk cache of response ETags, if enabled in config.
+
+        Entries which were not used for `ETAG_CACHE_MAX_AGE` are evicted when
+        the cache is opened, so that it only holds resources which are still
+        being synced.
+
+        Returns:
+            A shelf mapping requests to their last ETag and body, or None.
+        """
+        if self._etag_cache is None and self.config.get("etag_cache_path"):
+            if self._etag_cache_disabled or not self._lock_etag_cache():
+                return None
+            etag_cache = cast(
+                "shelve.Shelf[dict]", shelve.open(self.config["etag_cache_path"])
+            )
+            atexit.register(etag_cache.close)
+            expired_before = time.time() - self.ETAG_CACHE_MAX_AGE
+            for key in list(etag_cache.keys()):
+                if etag_cache[key].get("last_used", 0) < expired_before:
+                    del etag_cache[key]
+            self._etag_cache = etag_cache
+        return self._etag_cache
+
     @classproperty
     def logger(cls) -> logging.Logger:
         """Get logger.
@@ -51,6 +137,15 @@ class TapGitHub(Tap):
             th.IntegerType,
             description="Add a buffer to avoid consuming all query points for the token at hand. Defaults to 1000.",
         ),
+        th.Property(
+            "etag_cache_path",
+            th.StringType,
+            description=(
+                "Path of a local file used to cache response ETags across runs. "
+                "Unchanged responses are then served from the cache and do not "
+                "count against the API rate limit."
+            ),
+        ),
         th.Property(
             "searches",
             th.ArrayType(
@@ -1,15 +1,31 @@
+import datetime
+import json
 import logging
 import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from typing import Optional
 from unittest.mock import patch
 
 import pytest
+import requests
+import requests_cache
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
 from singer_sdk.helpers import _catalog as cat_helpers
 from singer_sdk.helpers._singer import Catalog
 
+from tap_github.client import GitHubRestStream
+from tap_github.repository_streams import _RepositoryIdsStream
 from tap_github.tap import TapGitHub
 
-from .fixtures import alternative_sync_chidren, repo_list_config, username_list_config
+from .fixtures import (
+    alternative_sync_chidren,
+    repo_list_config,
+    search_config,
+    username_list_config,
+)
 
 repo_list_2 = [
     "MeltanoLabs/tap-github",
@@ -49,6 +65,272 @@ def test_validate_repo_list_config(repo_list_config):
     assert partitions == repo_list_context
 
 
+@pytest.mark.repo_list([f"org/repo{i}" for i in range(250)])
+def test_repo_ids_are_fetched_in_batches(caplog, repo_list_config):
+    """Verify that repo ids are looked up 100 at a time, and that a missing repo
+    is reported against the right config entry"""
+    queries = []
+
+    def fake_request_records(temp_stream, context):
+        queries.append(temp_stream.query)
+        batch = temp_stream.repo_list[temp_stream.offset : temp_stream.offset + 100]
+        record = {}
+        for i, (org, repo) in enumerate(batch, start=temp_stream.offset):
+            # pretend that repo150 does not exist
+            record[f"repo{i}"] = (
+                None
+                if i == 150
+                else {"nameWithOwner": f"{org}/{repo}", "databaseId": i}
+            )
+        yield record
+
+    tap = TapGitHub(config=repo_list_config)
+    with patch.object(
+        _RepositoryIdsStream,
+        "request_records",
+        autospec=True,
+        side_effect=fake_request_records,
+    ):
+        with caplog.at_level(logging.INFO):
+            partitions = tap.streams["repositories"].partitions
+
+    assert len(queries) == 3
+    assert "repo0:" in queries[0] and "repo100:" not in queries[0]
+    assert "repo100:" in queries[1] and "repo200:" not in queries[1]
+    assert "repo249:" in queries[2]
+    assert len(partitions) == 249
+    assert {"org": "org", "repo": "repo150", "repo_id": 150} not in partitions
+    assert partitions[149] == {"org": "org", "repo": "repo149", "repo_id": 149}
+    assert partitions[150] == {"org": "org", "repo": "repo151", "repo_id": 151}
+    assert "Repository not found: org/repo150" in caplog.text
+
+
+def test_large_search_is_split_by_creation_date(search_config):
+    """Verify that searches above the 1k results limit are split into segments"""
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    first_day = datetime.date(2007, 10, 1)
+
+    def fake_search_count(query: str) -> int:
+        # pretend that 2 matching repositories are created every day
+        if "created:" not in query:
+            return 2 * ((today - first_day).days + 1)
+        created = query.split("created:")[1]
+        if created.startswith(">="):
+            start, end = datetime.date.fromisoformat(created[2:]), today
+        else:
+            start, end = map(datetime.date.fromisoformat, created.split(".."))
+        return 2 * ((end - start).days + 1)
+
+    tap = TapGitHub(config=search_config)
+    stream = tap.streams["repositories"]
+    with patch.object(stream, "get_search_count", side_effect=fake_search_count):
+        partitions = stream.partitions
+
+    assert len(partitions) > 1
+    for partition in partitions:
+        # the configured search is kept as is, so is the state partition
+        assert partition["search_name"] == "tap_something"
+        assert partition["search_query"] == "tap-+language:Python"
+        segment_query = f'{partition["search_query"]} {partition["search_segment"]}'
+        assert fake_search_count(segment_query) <= 1000
+    # segments cover all days, the last one being open-ended
+    assert partitions[0]["search_segment"].startswith("created:2007-10-01..")
+    assert partitions[-1]["search_segment"].startswith("created:>=")
+    assert sum(
+        fake_search_count(f'q {partition["search_segment"]}')
+        for partition in partitions
+    ) == fake_search_count("q")
+    assert stream.state_partitioning_keys == ["search_name", "search_query"]
+
+
+def test_search_requests_wait_for_rate_limit_reset(search_config):
+    """Verify that search requests pause once the search rate limit is used up"""
+    tap = TapGitHub(config=search_config)
+    stream = tap.streams["repositories"]
+    reset = int(time.time()) + 30
+    with patch("tap_github.repository_streams.time.sleep") as sleep:
+        stream.wait_for_search_rate_limit(
+            {"X-RateLimit-Remaining": "1", "X-RateLimit-Reset": str(reset)}
+        )
+        sleep.assert_not_called()
+        stream.wait_for_search_rate_limit(
+            {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(reset)}
+        )
+        sleep.assert_called_once()
+        assert 25 < sleep.call_args[0][0] <= 31
+
+
+@pytest.mark.parametrize(
+    "pushed_at,skipped",
+    [
+        ("2022-05-31T23:59:59Z", True),
+        ("2022-06-01T00:00:00Z", True),
+        ("2022-06-01T00:00:01Z", False),
+        # mock records built when skipping parent streams have no `pushed_at`
+        (None, False),
+    ],
+)
+def test_commits_are_skipped_for_repos_without_recent_push(
+    repo_list_config, pushed_at, skipped
+):
+    """Verify that commits are only requested for repos pushed after the bookmark"""
+    tap = TapGitHub(config=repo_list_config)
+    stream = tap.streams["commits"]
+    context = {"org": "org", "repo": "repo", "repo_id": 1, "pushed_at": pushed_at}
+    bookmark = datetime.datetime(2022, 6, 1, tzinfo=datetime.timezone.utc)
+    with patch.object(stream, "get_starting_timestamp", return_value=bookmark):
+        with patch.object(
+            GitHubRestStream, "get_records", return_value=iter([{"sha": "abc"}])
+        ) as get_records:
+            records = list(stream.get_records(context))
+
+    assert records == ([] if skipped else [{"sha": "abc"}])
+    assert get_records.called is not skipped
+
+
+def test_pushed_at_is_not_sent_to_graphql(repo_list_config):
+    """Verify that the `pushed_at` child context key is not a GraphQL variable"""
+    tap = TapGitHub(config=repo_list_config)
+    stream = tap.streams["dependencies"]
+    context = {"org": "org", "repo": "repo", "repo_id": 1, "pushed_at": "2022-06-01"}
+    with patch.object(stream, "get_starting_timestamp", return_value=None):
+        params = stream.get_url_params(context, None)
+
+    assert "pushed_at" not in params
+    assert params["repo"] == "repo"
+    # the context itself is left untouched
+    assert "per_page" not in context
+
+
+class FakeGitHubAdapter(BaseAdapter):
+    """Answer requests from a dict of `url -> (status, headers, body)`."""
+
+    def __init__(self, routes: dict):
+        super().__init__()
+        self.routes = routes
+        self.requests: list = []
+
+    def send(self, request, **kwargs):
+        self.requests.append(request)
+        status_code, headers, body = self.routes[request.url]
+        response = requests.Response()
+        response.status_code = status_code
+        response.reason = "OK" if status_code == 200 else "Not Modified"
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = json.dumps(body).encode() if body is not None else b""
+        response.url = request.url
+        response.request = request
+        response.elapsed = datetime.timedelta(0)
+        return response
+
+    def close(self):
+        pass
+
+
+def test_etag_cache_replays_not_modified_pages(repo_list_config, tmp_path):
+    """Verify that 304 responses are answered from the cache, with pagination"""
+    config = {**repo_list_config, "etag_cache_path": str(tmp_path / "etags")}
+    url = "https://api.github.com/repos/org/repo/contributors?per_page=100"
+    page_2_url = f"{url}&page=2"
+    contributors = [
+        [{"login": "alice", "id": 1, "type": "User"}],
+        [{"login": "bob", "id": 2, "type": "User"}],
+    ]
+    # the fake adapter must see every request, bypass the tests' requests_cache
+    with requests_cache.disabled(), patch(
+        "tap_github.authenticator.GitHubTokenAuthenticator.prepare_tokens",
+        return_value={},
+    ):
+        tap = TapGitHub(config=config)
+        stream = tap.streams["contributors"]
+        context = {"org": "org", "repo": "repo", "repo_id": 1}
+
+        adapter = FakeGitHubAdapter(
+            {
+                url: (
+                    200,
+                    {"ETag": '"etag-1"', "Link": f'<{page_2_url}>; rel="next"'},
+                    contributors[0],
+                ),
+                page_2_url: (200, {"ETag": '"etag-2"'}, contributors[1]),
+            }
+        )
+        tap.requests_session.mount("https://", adapter)
+        first_run = list(stream.get_records(context))
+        assert [request.url for request in adapter.requests] == [url, page_2_url]
+        assert all("If-None-Match" not in r.headers for r in adapter.requests)
+
+        # Nothing changed since: GitHub answers 304 without a body nor a Link
+        adapter = FakeGitHubAdapter({url: (304, {}, None), page_2_url: (304, {}, None)})
+        tap.requests_session.mount("https://", adapter)
+        second_run = list(stream.get_records(context))
+
+    assert [request.url for request in adapter.requests] == [url, page_2_url]
+    assert [r.headers["If-None-Match"] for r in adapter.requests] == [
+        '"etag-1"',
+        '"etag-2"',
+    ]
+    assert [record["login"] for record in second_run] == ["alice", "bob"]
+    assert second_run == first_run
+
+
+class NotModifiedHandler(BaseHTTPRequestHandler):
+    """Answer 304 to conditional requests and count the connections opened."""
+
+    protocol_version = "HTTP/1.1"
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        NotModifiedHandler.connections += 1
+
+    def do_GET(self):
+        if "If-None-Match" in self.headers:
+            self.send_response(304)
+            self.send_header("ETag", '"etag-1"')
+            self.end_headers()
+            return
+        body = json.dumps([{"login": "alice", "id": 1, "type": "User"}]).encode()
+        self.send_response(200)
+        self.send_header("ETag", '"etag-1"')
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_etag_cache_keeps_connections_alive(repo_list_config, tmp_path):
+    """Verify that 304 responses release their connection to the session pool"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), NotModifiedHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    config = {
+        **repo_list_config,
+        "etag_cache_path": str(tmp_path / "etags"),
+        "api_url_base": f"http://127.0.0.1:{server.server_port}",
+    }
+    try:
+        with requests_cache.disabled(), patch(
+            "tap_github.authenticator.GitHubTokenAuthenticator.prepare_tokens",
+            return_value={},
+        ):
+            tap = TapGitHub(config=config)
+            stream = tap.streams["contributors"]
+            context = {"org": "org", "repo": "repo", "repo_id": 1}
+            NotModifiedHandler.connections = 0
+            for _ in range(5):
+                records = list(stream.get_records(context))
+                assert [record["login"] for record in records] == ["alice"]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert NotModifiedHandler.connections == 1
+
+
 def run_tap_with_config(capsys, config_obj: dict, skip_stream: Optional[str]) -> str:
     """
     Run the tap with the given config and capture stdout, optionally
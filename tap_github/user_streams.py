@@ -10,6 +10,45 @@ from tap_github.client import GitHubGraphqlStream, GitHubRestStream
 from tap_github.schema_objects import user_object
 
 
+class _UserIdsStream(GitHubGraphqlStream):
+    """Temp handmade stream to reuse all the graphql setup of the tap.
+
+    Used by `UserStream.get_user_ids`. It is defined once at import time
+    rather than on every call.
+    """
+
+    name = "tempStream"
+    schema = th.PropertiesList(
+        th.Property("id", th.StringType),
+        th.Property("databaseId", th.IntegerType),
+    ).to_dict()
+
+    # Keep each query small enough to stay well within GitHub's
+    # GraphQL resource limits and request timeouts.
+    MAX_USERS_PER_QUERY = 100
+
+    def __init__(self, tap, user_list) -> None:
+        super().__init__(tap)
+        self.user_list = user_list
+        # index in `user_list` of the first user of the current batch
+        self.offset = 0
+
+    @property
+    def query(self) -> str:
+        chunks = list()
+        batch = self.user_list[self.offset : self.offset + self.MAX_USERS_PER_QUERY]
+        # aliases use the index in the full list so that a missing
+        # user can be traced back to its config entry.
+        for i, user in enumerate(batch, start=self.offset):
+            # we use the `repositoryOwner` query which is the only one that
+            # works on both users and orgs with graphql. REST is less picky
+            # and the /user endpoint works for all types.
+            chunks.append(
+                f'user{i}: repositoryOwner(login: "{user}") {{ login avatarUrl}}'
+            )
+        return "query {" + " ".join(chunks) + " }"
+
+
 class UserStream(GitHubRestStream):
     """Defines 'User' stream."""
 
@@ -48,35 +87,8 @@ class UserStream(GitHubRestStream):
         It also removes non-existant repos and corrects casing to ensure
         data is correct downstream.
         """
-        # use a temp handmade stream to reuse all the graphql setup of the tap
-        class TempStream(GitHubGraphqlStream):
-            name = "tempStream"
-            schema = th.PropertiesList(
-                th.Property("id", th.StringType),
-                th.Property("databaseId", th.IntegerType),
-            ).to_dict()
-
-            def __init__(self, tap, user_list) -> None:
-                super().__init__(tap)
-                self.user_list = user_list
-
-            @property
-            def query(self) -> str:
-                chunks = list()
-                # there is probably some limit to how many items can be requested
-                # in a single query, but it's well above 1k.
-                for i, user in enumerate(self.user_list):
-                    # we use the `repositoryOwner` query which is the only one that
-                    # works on both users and orgs with graphql. REST is less picky
-                    # and the /user endpoint works for all types.
-                    chunks.append(
-                        f'user{i}: repositoryOwner(login: "{user}") '
-                        "{ login avatarUrl}"
-                    )
-                return "query {" + " ".join(chunks) + " }"
-
         users_with_ids: list = list()
-        temp_stream = TempStream(self._tap, list(user_list))
+        temp_stream = _UserIdsStream(self._tap, list(user_list))
 
         databaseIdPattern: re.Pattern = re.compile(
             r"https://avatars.githubusercontent.com/u/(\d+)?.*"
@@ -86,7 +98,11 @@ class UserStream(GitHubRestStream):
         # See https://github.com/MeltanoLabs/tap-github/issues/110
         # Also remove repos which do not exist to avoid crashing further down
         # the line.
-        for record in temp_stream.request_records({}):
+        records: List[dict] = list()
+        for offset in range(0, len(user_list), temp_stream.MAX_USERS_PER_QUERY):
+            temp_stream.offset = offset
+            records.extend(temp_stream.request_records({}))
+        for record in records:
             for item in record.keys():
                 try:
                     username = record[item]["login"]